@@ -8,11 +8,16 @@ Usage:
     python run.py          # Check progress on all steps
     python run.py --step 3 # Test only step 3 (chunking)
     python run.py --demo   # Run the full Q&A demo
+    python run.py --no-cache  # Re-run tests even for unchanged passing steps
 """
 
+import importlib.util
+import json
+import re
 import subprocess
 import sys
 import os
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
 # Colors for terminal output
@@ -25,9 +30,25 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
-# For Windows compatibility
+# Compiled check_function_implemented() patterns, keyed by function name
+_IMPL_RE_CACHE = {}
+
+# JUnit report written by the combined pytest run in check_all_steps()
+REPORT_PATH = ".rag_report.xml"
+
+# Steps whose source and test files are unchanged since they last passed
+PROGRESS_PATH = ".rag_progress.json"
+
+# For Windows compatibility - enable ANSI colors without spawning a shell
 if sys.platform == 'win32':
-    os.system('color')  # Enable ANSI colors on Windows
+    try:
+        import colorama
+        colorama.just_fix_windows_console()
+    except (ImportError, AttributeError):
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # ENABLE_PROCESSED_OUTPUT | ENABLE_WRAP_AT_EOL_OUTPUT | ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
 
 STEPS = [
     {
@@ -135,7 +156,7 @@ def check_environment():
         )
         if "rag-qdrant" not in result.stdout:
             return False, "Qdrant not running. Run: docker-compose up -d"
-    except:
+    except (OSError, subprocess.SubprocessError):
         return False, "Could not check Docker containers"
 
     # Check OpenAI API key
@@ -148,18 +169,23 @@ def check_environment():
 def check_function_implemented(file_path, function_name):
     """Check if a function has been implemented (not just raising NotImplementedError)."""
     try:
-        with open(file_path, 'r') as f:
-            content = f.read()
+        # Everything we look for is ASCII, so search the raw bytes
+        content = Path(file_path).read_bytes()
 
         # Look for the function and check if it still raises NotImplementedError
         # This is a simple heuristic
-        import re
-        pattern = rf'def {function_name}\([^)]*\).*?(?=\ndef |\Z)'
-        match = re.search(pattern, content, re.DOTALL)
+        pattern = _IMPL_RE_CACHE.get(function_name)
+        if pattern is None:
+            pattern = re.compile(
+                rb'def ' + re.escape(function_name.encode()) + rb'\([^)]*\).*?(?=\ndef |\Z)',
+                re.DOTALL
+            )
+            _IMPL_RE_CACHE[function_name] = pattern
+        match = pattern.search(content)
 
         if match:
             func_body = match.group(0)
-            if 'raise NotImplementedError' in func_body:
+            if b'raise NotImplementedError' in func_body:
                 return False, "Not implemented yet"
 
         return True, "Implemented"
@@ -167,48 +193,181 @@ def check_function_implemented(file_path, function_name):
         return False, f"File not found: {file_path}"
 
 
-def run_tests(test_path):
-    """Run pytest for a specific test file/class."""
+def _junit_prefix(test_path):
+    """Convert a pytest path like 'tests/test_x.py::TestY' to a JUnit classname prefix."""
+    file_part, _, node = test_path.partition("::")
+    if file_part.endswith(".py"):
+        file_part = file_part[:-3]
+    prefix = file_part.replace("\\", "/").replace("/", ".")
+    if node:
+        prefix += "." + node.replace("::", ".")
+    return prefix
+
+
+def parse_junit_report(report_path, test_paths):
+    """
+    Count passed, failed and skipped test cases in a JUnit report for each test path.
+
+    Returns:
+        Dict mapping each test path to a (passed, failed, skipped) tuple
+    """
+    prefixes = {path: _junit_prefix(path) for path in test_paths}
+    counts = {path: [0, 0, 0] for path in test_paths}
+
+    for case in ET.parse(report_path).iter("testcase"):
+        classname = case.get("classname", "")
+        if case.find("failure") is not None or case.find("error") is not None:
+            outcome = 1
+        elif case.find("skipped") is not None:
+            outcome = 2
+        else:
+            outcome = 0
+
+        for path, prefix in prefixes.items():
+            if classname:
+                matches = classname == prefix or classname.startswith(prefix + ".")
+            else:
+                # Collection errors have no classname, only the module name
+                name = case.get("name", "")
+                matches = prefix == name or prefix.startswith(name + ".")
+            if matches:
+                counts[path][outcome] += 1
+
+    return {path: tuple(c) for path, c in counts.items()}
+
+
+def parse_pytest_summary(output):
+    """Extract (passed, failed, skipped) counts from the final summary line of pytest output."""
+    lines = output.strip().splitlines()
+    summary = lines[-1] if lines else ""
+    counts = {word: int(n) for n, word in re.findall(r'(\d+) (passed|failed|skipped)', summary)}
+    return counts.get("passed", 0), counts.get("failed", 0), counts.get("skipped", 0)
+
+
+def run_tests(test_paths):
+    """
+    Run pytest once for several test files/classes.
+
+    Uses pytest-xdist when it is installed so the files run in parallel, and
+    reads the JUnit report to attribute results back to each test path.
+
+    Returns:
+        Dict mapping each test path to a (success, message) tuple
+    """
+    # pytest aborts the whole run on a missing path, so report those up front
+    missing = [p for p in test_paths if not Path(p.partition("::")[0]).is_file()]
+    results = {path: (False, "Test file not found") for path in missing}
+    test_paths = [p for p in test_paths if p not in results]
+    if not test_paths:
+        return results
+
+    # Pass each file once; results are mapped back to classes via the report,
+    # so a renamed test class fails only its own step
+    test_files = list(dict.fromkeys(p.partition("::")[0] for p in test_paths))
+
+    command = [
+        sys.executable, "-m", "pytest", *test_files,
+        "--tb=short", "-q", "--no-header", f"--junitxml={REPORT_PATH}",
+        # A module that fails to import should only fail its own step
+        "--continue-on-collection-errors"
+    ]
+    workers = max(1, (os.cpu_count() or 1) - 2)
+    if workers > 1 and importlib.util.find_spec("xdist") is not None:
+        # loadfile keeps each test file on one worker: the retriever tests
+        # share a Qdrant collection and must not interleave.
+        command += ["-n", str(workers), "--dist", "loadfile"]
+
+    Path(REPORT_PATH).unlink(missing_ok=True)
+
     try:
         result = subprocess.run(
-            [sys.executable, "-m", "pytest", test_path, "-v", "--tb=short", "-q"],
+            command,
             capture_output=True,
             text=True,
-            timeout=120
+            timeout=300
         )
-
-        # Parse output for pass/fail count
-        output = result.stdout + result.stderr
-
-        if result.returncode == 0:
-            return True, "All tests passed!"
-        else:
-            # Try to extract failure count
-            import re
-            match = re.search(r'(\d+) passed', output)
-            passed = int(match.group(1)) if match else 0
-            match = re.search(r'(\d+) failed', output)
-            failed = int(match.group(1)) if match else 0
-
-            if failed > 0:
-                return False, f"{passed} passed, {failed} failed"
-            else:
-                return False, "Tests failed (check output below)"
-
     except subprocess.TimeoutExpired:
-        return False, "Tests timed out"
+        results.update({path: (False, "Tests timed out") for path in test_paths})
+        return results
     except Exception as e:
-        return False, f"Error running tests: {e}"
+        results.update({path: (False, f"Error running tests: {e}") for path in test_paths})
+        return results
 
+    try:
+        counts = parse_junit_report(REPORT_PATH, test_paths)
+    except (FileNotFoundError, ET.ParseError):
+        # pytest stopped before writing a report - fall back to its output
+        counts = dict.fromkeys(test_paths, parse_pytest_summary(result.stdout))
+        if result.returncode != 0 and not any(c[1] for c in counts.values()):
+            results.update({path: (False, "Tests failed (check output below)") for path in test_paths})
+            return results
+
+    for path, (passed, failed, skipped) in counts.items():
+        results[path] = (passed > 0 and failed == 0, _result_message(passed, failed, skipped))
+    return results
+
+
+def _result_message(passed, failed, skipped):
+    """Describe a step's test counts, e.g. '3 passed, 1 failed'."""
+    if failed > 0:
+        return f"{passed} passed, {failed} failed"
+    if passed > 0:
+        return "All tests passed!"
+    if skipped > 0:
+        # Skipped tests prove nothing - usually Qdrant or the API key is missing
+        return f"All {skipped} tests skipped (check Qdrant and OPENAI_API_KEY)"
+    return "Tests failed (check output below)"
+
+
+def load_progress():
+    """Load cached step results from PROGRESS_PATH."""
+    try:
+        with open(PROGRESS_PATH, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_progress(progress):
+    """Save cached step results to PROGRESS_PATH."""
+    with open(PROGRESS_PATH, "w") as f:
+        json.dump(progress, f, indent=2)
+
+
+def step_mtimes(step):
+    """
+    Modification times of every file a step's tests depend on (None if missing).
+
+    Later steps call into earlier modules (answer_question uses search and
+    generate_embeddings), so all of src/ and the shared conftest are included
+    alongside the step's own test file.
+    """
+    paths = {step["test"].partition("::")[0], "tests/conftest.py"}
+    if step.get("file"):
+        paths.add(step["file"])
+    paths.update(str(p) for p in Path("src").glob("*.py"))
+    try:
+        return {path: os.stat(path).st_mtime for path in sorted(paths)}
+    except OSError:
+        return None
 
-def check_all_steps():
-    """Check progress on all steps."""
+
+def check_all_steps(use_cache=True):
+    """
+    Check progress on all steps.
+
+    Args:
+        use_cache: Skip the tests of steps that passed before and whose source
+            and test files (see step_mtimes) have not been modified since
+    """
     print_header()
     print(f"  {Colors.BOLD}Checking your progress...{Colors.END}\n")
 
     results = []
+    pending_tests = []
     completed = 0
     total_testable = 0
+    progress = load_progress()
 
     for step in STEPS:
         if step.get("check_func") == "check_environment":
@@ -235,15 +394,36 @@ def check_all_steps():
                     total_testable += 1
                     continue
 
-            # Run the tests
-            success, message = run_tests(step["test"])
-            status = "pass" if success else "fail"
-            results.append((step, status, message))
-
-            if success:
+            # Unchanged since the last passing run - no need to start pytest
+            mtimes = step_mtimes(step)
+            cached = progress.get(str(step["number"]))
+            if use_cache and mtimes and cached == {"mtimes": mtimes, "passed": True}:
+                results.append((step, "pass", ""))
                 completed += 1
+                total_testable += 1
+                continue
+
+            # Queue the tests - they all run together below
+            results.append((step, None, None))
+            pending_tests.append(step["test"])
             total_testable += 1
 
+    # Run all queued tests in a single pytest invocation
+    if pending_tests:
+        test_results = run_tests(pending_tests)
+        for i, (step, status, message) in enumerate(results):
+            if status is None:
+                success, message = test_results[step["test"]]
+                results[i] = (step, "pass" if success else "fail", message)
+                mtimes = step_mtimes(step)
+                if success and mtimes:
+                    progress[str(step["number"])] = {"mtimes": mtimes, "passed": True}
+                else:
+                    progress.pop(str(step["number"]), None)
+                if success:
+                    completed += 1
+        save_progress(progress)
+
     # Print results
     print(f"  {Colors.BOLD}Progress:{Colors.END}\n")
     for step, status, message in results:
@@ -293,7 +473,7 @@ def run_demo():
         # Try importing and running
         sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-        from ingest import process_documents
+        from ingest import iter_chunks
         from embeddings import embed_chunks
         from retriever import store_embeddings, initialize_collection, get_client, search
         from qa_chain import answer_question
@@ -303,15 +483,10 @@ def run_demo():
         client = get_client()
         initialize_collection(client, recreate=True)
 
-        # Process documents
-        print(f"  {Colors.CYAN}Loading documents...{Colors.END}")
-        chunks = process_documents(str(Path(__file__).parent / "data" / "sample_docs"))
-        print(f"  {Colors.GREEN}✓ Created {len(chunks)} chunks{Colors.END}")
-
-        # Generate embeddings
-        print(f"  {Colors.CYAN}Generating embeddings (this may take a moment)...{Colors.END}")
-        chunks = embed_chunks(chunks)
-        print(f"  {Colors.GREEN}✓ Embeddings generated{Colors.END}")
+        # Chunk documents and generate embeddings in one streaming pass
+        print(f"  {Colors.CYAN}Loading documents and generating embeddings (this may take a moment)...{Colors.END}")
+        chunks = embed_chunks(iter_chunks(str(Path(__file__).parent / "data" / "sample_docs")))
+        print(f"  {Colors.GREEN}✓ Created and embedded {len(chunks)} chunks{Colors.END}")
 
         # Store
         print(f"  {Colors.CYAN}Storing in vector database...{Colors.END}")
@@ -421,6 +596,8 @@ def main():
     parser = argparse.ArgumentParser(description="RAG Challenge Runner")
     parser.add_argument("--step", type=int, help="Run tests for a specific step (1-7)")
     parser.add_argument("--demo", action="store_true", help="Run the full Q&A demo")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-run every step's tests, ignoring cached results")
 
     args = parser.parse_args()
 
@@ -431,7 +608,7 @@ def main():
     elif args.step:
         run_single_step(args.step)
     else:
-        check_all_steps()
+        check_all_steps(use_cache=not args.no_cache)
 
 
 if __name__ == "__main__":
@@ -9,34 +9,256 @@ Your Task (Step 4):
 - Handle batching for efficiency
 """
 
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import json
 import os
-from typing import List, Dict, Optional
-from openai import OpenAI
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import numpy as np
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 
 
 # Initialize OpenAI client - requires OPENAI_API_KEY environment variable
 client: Optional[OpenAI] = None
 
+# HTTP settings for the OpenAI clients: keep connections alive so requests
+# skip the TLS handshake, and multiplex over HTTP/2 when h2 is installed
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Embedding requests kept in flight at once when a call spans several batches
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "8"))
+
+# On-disk embedding cache shared across runs (set to "" to disable)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    str(Path(__file__).parent.parent / ".emb_cache.sqlite3")
+)
+
+
+def _get_api_key() -> str:
+    """Read the OpenAI API key from the environment."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY environment variable is not set.\n"
+            "Get your API key from: https://platform.openai.com/api-keys\n"
+            "Then run: export OPENAI_API_KEY='your-key-here'"
+        )
+    return api_key
+
 
 def get_client() -> OpenAI:
     """Get or create OpenAI client."""
     global client
     if client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "OPENAI_API_KEY environment variable is not set.\n"
-                "Get your API key from: https://platform.openai.com/api-keys\n"
-                "Then run: export OPENAI_API_KEY='your-key-here'"
-            )
-        client = OpenAI(api_key=api_key)
+        http_client = DefaultHttpxClient(http2=HTTP2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        client = OpenAI(api_key=_get_api_key(), http_client=http_client)
     return client
 
 
+def _aget_client() -> AsyncOpenAI:
+    """
+    Create an async OpenAI client for one concurrent embedding run.
+
+    Unlike get_client() this is not cached: the client's connection pool is
+    bound to the event loop that uses it, and every generate_embeddings()
+    call runs its own loop. Rate-limit (429) responses are retried with
+    exponential backoff by the client itself.
+    """
+    http_client = DefaultAsyncHttpxClient(http2=HTTP2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return AsyncOpenAI(api_key=_get_api_key(), http_client=http_client, max_retries=5)
+
+
+def _event_loop_running() -> bool:
+    """Check whether we are being called from inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _decode_embeddings(raw_response) -> np.ndarray:
+    """
+    Decode a raw base64 embeddings response into an (n, dim) float32 matrix.
+
+    Reading the base64 payload directly avoids building a Python float for
+    every vector component, which is what parsing into the SDK models does.
+    """
+    data = json.loads(raw_response.http_response.content)["data"]
+    data.sort(key=lambda item: item["index"])
+    buffer = b"".join(base64.b64decode(item["embedding"]) for item in data)
+    return np.frombuffer(buffer, dtype="<f4").reshape(len(data), -1)
+
+
+async def _embed_batches_async(
+    batches: List[List[str]],
+    model: str,
+    max_concurrency: int
+) -> List[np.ndarray]:
+    """Embed all batches concurrently, keeping at most max_concurrency requests in flight."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    aclient = _aget_client()
+
+    async def _one(batch: List[str]) -> np.ndarray:
+        async with semaphore:
+            raw = await aclient.embeddings.with_raw_response.create(
+                input=batch, model=model, encoding_format="base64"
+            )
+            return _decode_embeddings(raw)
+
+    try:
+        # gather() preserves input order, so results line up with batches
+        return await asyncio.gather(*[_one(batch) for batch in batches])
+    finally:
+        await aclient.close()
+
+
+def _cache_key(text: str, model: str) -> bytes:
+    """Cache key for one text embedded with one model."""
+    return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+def _open_cache() -> Optional[sqlite3.Connection]:
+    """Open the embedding cache database, or return None if it is disabled or unusable."""
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    try:
+        db = sqlite3.connect(EMBEDDING_CACHE_PATH)
+    except sqlite3.Error:
+        return None  # e.g. an unwritable location - embed without the cache
+    try:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+    except sqlite3.Error:
+        db.close()
+        return None
+    return db
+
+
+def _cache_lookup(db: sqlite3.Connection, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+    """Fetch cached embeddings for the given keys."""
+    found = {}
+    # Stay below SQLite's limit on query parameters
+    for i in range(0, len(keys), 500):
+        batch = keys[i:i + 500]
+        rows = db.execute(
+            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+            batch
+        )
+        for key, blob in rows:
+            found[key] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def _cache_store(db: sqlite3.Connection, keys: List[bytes], matrix: np.ndarray) -> None:
+    """Save embeddings to the cache as float32 bytes."""
+    with db:
+        db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, row.tobytes()) for key, row in zip(keys, matrix)]
+        )
+
+
+def _embed_uncached(
+    texts: List[str],
+    model: str,
+    batch_size: int,
+    max_concurrency: int
+) -> np.ndarray:
+    """Call the embeddings API for all texts, batching and overlapping requests."""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def _embed_batch(batch: List[str]) -> np.ndarray:
+        return _decode_embeddings(get_client().embeddings.with_raw_response.create(
+            input=batch, model=model, encoding_format="base64"
+        ))
+
+    if len(batches) == 1 or max_concurrency <= 1:
+        # Nothing to overlap - call directly
+        results = [_embed_batch(batch) for batch in batches]
+    elif _event_loop_running():
+        # asyncio.run() can't start inside a running loop, so overlap the
+        # requests on threads sharing the (thread-safe) sync client instead
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as pool:
+            results = list(pool.map(_embed_batch, batches))
+    else:
+        results = asyncio.run(_embed_batches_async(batches, model, max_concurrency))
+
+    return np.concatenate(results)
+
+
+def generate_embedding_matrix(
+    texts: List[str],
+    model: str = "text-embedding-3-small",
+    batch_size: int = 100,
+    max_concurrency: int = EMBEDDING_CONCURRENCY
+) -> np.ndarray:
+    """
+    Generate embeddings for a list of text strings as one float32 matrix.
+
+    Same as generate_embeddings(), but returns an (n, dim) NumPy array so
+    bulk callers never materialize the vectors as Python floats.
+
+    Args:
+        texts: List of text strings to embed
+        model: OpenAI embedding model to use (default: text-embedding-3-small)
+        batch_size: Number of texts to embed in each API call (default: 100)
+        max_concurrency: Maximum number of API calls in flight at once
+            (default: EMBEDDING_CONCURRENCY, 8 unless set in the environment)
+
+    Returns:
+        float32 array with one row per input text
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    db = _open_cache()
+    if db is None:
+        return _embed_uncached(texts, model, batch_size, max_concurrency)
+
+    with closing(db):
+        keys = [_cache_key(text, model) for text in texts]
+        try:
+            cached = _cache_lookup(db, keys)
+        except sqlite3.Error:
+            cached = {}  # Unreadable cache - treat every text as a miss
+
+        # Only texts we have never embedded with this model hit the API
+        misses = [key for key in dict.fromkeys(keys) if key not in cached]
+        if misses:
+            text_for_key = dict(zip(keys, texts))
+            fresh = _embed_uncached(
+                [text_for_key[key] for key in misses], model, batch_size, max_concurrency
+            )
+            try:
+                _cache_store(db, misses, fresh)
+            except sqlite3.Error:
+                # e.g. "database is locked" by another process writing at the
+                # same time - still return the embeddings we just paid for
+                pass
+            cached.update(zip(misses, fresh))
+
+    return np.stack([cached[key] for key in keys])
+
+
 def generate_embeddings(
     texts: List[str],
     model: str = "text-embedding-3-small",
-    batch_size: int = 100
+    batch_size: int = 100,
+    max_concurrency: int = EMBEDDING_CONCURRENCY
 ) -> List[List[float]]:
     """
     Generate embeddings for a list of text strings.
@@ -47,6 +269,8 @@ def generate_embeddings(
         texts: List of text strings to embed
         model: OpenAI embedding model to use (default: text-embedding-3-small)
         batch_size: Number of texts to embed in each API call (default: 100)
+        max_concurrency: Maximum number of API calls in flight at once
+            (default: EMBEDDING_CONCURRENCY, 8 unless set in the environment)
 
     Returns:
         List of embedding vectors (each is a list of floats)
@@ -67,35 +291,42 @@ def generate_embeddings(
     if not texts:
         return []
 
-    client = get_client()
-    all_embeddings = []
-
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        response = client.embeddings.create(input=batch, model=model)
-        batch_embeddings = [item.embedding for item in response.data]
-        all_embeddings.extend(batch_embeddings)
+    return generate_embedding_matrix(texts, model, batch_size, max_concurrency).tolist()
 
-    return all_embeddings
 
-
-def embed_chunks(chunks: List[Dict]) -> List[Dict]:
+def embed_chunks(chunks: Iterable[Dict], batch_size: int = 1000) -> List[Dict]:
     """
     Add embeddings to chunk dictionaries.
 
+    Chunks are consumed batch_size at a time, so a generator such as
+    ingest.iter_chunks() is never fully expanded before embedding starts.
+
     Args:
-        chunks: List of chunk dicts with 'content' key
+        chunks: Iterable of chunk dicts with 'content' key
+        batch_size: Number of chunks to embed per block (default: 1000)
 
     Returns:
-        Same chunks with 'embedding' key added
+        The chunks as a list with 'embedding' key added. Each embedding is a
+        row of a float32 NumPy block rather than a list of Python floats.
     """
-    texts = [chunk["content"] for chunk in chunks]
-    embeddings = generate_embeddings(texts)
+    chunks = iter(chunks)
+    embedded = []
+
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            break
+
+        # Embed each distinct text once; repeated boilerplate shares the result
+        unique_texts = list(dict.fromkeys(chunk["content"] for chunk in batch))
+        block = generate_embedding_matrix(unique_texts)
+        rows = dict(zip(unique_texts, block))
 
-    for chunk, embedding in zip(chunks, embeddings):
-        chunk["embedding"] = embedding
+        for chunk in batch:
+            chunk["embedding"] = rows[chunk["content"]]
+        embedded.extend(batch)
 
-    return chunks
+    return embedded
 
 
 if __name__ == "__main__":
@@ -9,10 +9,23 @@ Your Task (Step 3):
 - Recommended: 500 characters per chunk, 100 character overlap
 """
 
+import functools
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
 from pathlib import Path
 
+import tiktoken
+
+
+def _read_text(path: Path) -> str:
+    """Read a UTF-8 file, hinting the kernel that it will be read sequentially."""
+    # Text mode keeps universal newlines, so CRLF checkouts chunk like LF ones
+    with open(path, "r", encoding="utf-8") as f:
+        if hasattr(os, "posix_fadvise"):  # Not available on Windows
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return f.read()
+
 
 def load_documents(docs_path: str) -> List[Dict]:
     """
@@ -22,23 +35,26 @@ def load_documents(docs_path: str) -> List[Dict]:
         docs_path: Path to directory containing .txt files
 
     Returns:
-        List of document dicts with 'content' and 'metadata' keys
+        List of document dicts with 'content' and 'metadata' keys, sorted by file name
     """
-    documents = []
     docs_dir = Path(docs_path)
+    # Sorted so chunk order (and anything derived from it) is deterministic
+    paths = sorted(docs_dir.glob("*.txt"))
 
-    for file_path in docs_dir.glob("*.txt"):
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            documents.append({
-                "content": content,
-                "metadata": {
-                    "source": file_path.name,
-                    "path": str(file_path)
-                }
-            })
+    # File reads release the GIL, so a thread pool overlaps their I/O waits
+    with ThreadPoolExecutor(max_workers=min(32, len(paths) or 1)) as executor:
+        contents = list(executor.map(_read_text, paths))
 
-    return documents
+    return [
+        {
+            "content": content,
+            "metadata": {
+                "source": file_path.name,
+                "path": str(file_path)
+            }
+        }
+        for file_path, content in zip(paths, contents)
+    ]
 
 
 def chunk_document(content: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
@@ -55,6 +71,9 @@ def chunk_document(content: str, chunk_size: int = 500, overlap: int = 100) -> L
     Returns:
         List of text chunks
 
+    Raises:
+        ValueError: If chunk_size is not positive or overlap is not in [0, chunk_size)
+
     Example:
         >>> text = "Hello world. This is a test document for chunking."
         >>> chunks = chunk_document(text, chunk_size=20, overlap=5)
@@ -67,53 +86,172 @@ def chunk_document(content: str, chunk_size: int = 500, overlap: int = 100) -> L
         - Ensure no chunk exceeds chunk_size
         - The last chunk may be smaller than chunk_size
     """
-    if not content:
+    return _sliding_windows(content, chunk_size, overlap)
+
+
+def _check_window_params(chunk_size: int, overlap: int) -> None:
+    """Raise ValueError unless chunk_size is positive and overlap is in [0, chunk_size)."""
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError(
+            f"overlap must be between 0 and chunk_size - 1, got {overlap} "
+            f"for chunk_size {chunk_size}"
+        )
+
+
+def _sliding_windows(items: Sequence, chunk_size: int, overlap: int) -> List[Sequence]:
+    """Split a string or list into overlapping windows of at most chunk_size items."""
+    _check_window_params(chunk_size, overlap)
+
+    if not items:
         return []
 
-    if len(content) <= chunk_size:
-        return [content]
+    if len(items) <= chunk_size:
+        return [items]
 
-    chunks = []
-    start = 0
     step = chunk_size - overlap
 
-    while start < len(content):
-        end = start + chunk_size
-        chunk = content[start:end]
-        chunks.append(chunk)
-        start += step
+    # Stop once the remaining items are covered by the previous window's overlap.
+    # With overlap == 0 this is already a plain stride of chunk_size.
+    starts = range(0, max(1, len(items) - overlap), step)
+    return [items[start:start + chunk_size] for start in starts]
+
+
+def _token_windows(cuttable: List[bool], chunk_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Overlapping (start, end) token windows that only start or end where cuttable is True.
+
+    Windows are the same as _sliding_windows() gives when every position is
+    cuttable; otherwise each edge moves back to the nearest cuttable position,
+    so windows never grow past chunk_size and never leave a gap.
+    """
+    _check_window_params(chunk_size, overlap)
+    n = len(cuttable)
+
+    def cut_before(i: int, floor: int) -> int:
+        """Nearest cuttable position in (floor, i], or floor if there is none."""
+        while floor < i < n and not cuttable[i]:
+            i -= 1
+        return i
+
+    windows = []
+    start = 0
+    while start < n:
+        end = cut_before(min(start + chunk_size, n), start)
+        if end <= start:
+            # A single character spans more than chunk_size tokens - keep it whole
+            end = start + 1
+            while end < n and not cuttable[end]:
+                end += 1
+        windows.append((start, end))
+        if end == n:
+            break
+        next_start = cut_before(end - overlap, start)
+        start = next_start if next_start > start else end
+    return windows
 
-    return chunks
 
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model: str) -> "tiktoken.Encoding":
+    """Load (once) the tokenizer used by an OpenAI model."""
+    return tiktoken.encoding_for_model(model)
 
-def process_documents(docs_path: str, chunk_size: int = 500, overlap: int = 100) -> List[Dict]:
+
+def chunk_document_tokens(
+    content: str,
+    chunk_size: int = 400,
+    overlap: int = 50,
+    model: str = "text-embedding-3-small"
+) -> List[str]:
     """
-    Load documents and split them into chunks with metadata.
+    Split a document into overlapping chunks measured in tokens.
+
+    Embedding cost and model context limits are counted in tokens, so this
+    packs each chunk to a known token budget instead of a character count.
+
+    Args:
+        content: The full text content to chunk
+        chunk_size: Maximum size of each chunk (default: 400 tokens)
+        overlap: Number of tokens to overlap between chunks (default: 50)
+        model: OpenAI model whose tokenizer defines the tokens
+
+    Returns:
+        List of text chunks
+
+    Raises:
+        ValueError: If chunk_size is not positive or overlap is not in [0, chunk_size)
+    """
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(content)
+    # Tokens are byte sequences, so a multi-byte character (CJK, emoji) can
+    # span several of them. Only cut before a token that starts a character,
+    # otherwise the halves would decode to U+FFFD replacement characters.
+    cuttable = [token[0] & 0xC0 != 0x80 for token in encoding.decode_tokens_bytes(tokens)]
+    windows = _token_windows(cuttable, chunk_size, overlap)
+    return [encoding.decode(tokens[start:end]) for start, end in windows]
+
+
+Chunker = Callable[[str, int, int], List[str]]
+
+
+def iter_chunks(
+    docs_path: str,
+    chunk_size: int = 500,
+    overlap: int = 100,
+    chunker: Chunker = chunk_document
+) -> Iterator[Dict]:
+    """
+    Load documents and lazily yield their chunks with metadata.
+
+    Chunks are produced one at a time so a consumer such as embed_chunks()
+    can process them in batches without materializing the whole corpus.
 
     Args:
         docs_path: Path to documents directory
         chunk_size: Size of each chunk
         overlap: Overlap between chunks
+        chunker: Function that splits one document (default: chunk_document,
+            which counts characters; pass chunk_document_tokens to count tokens)
 
-    Returns:
-        List of chunk dicts with 'content' and 'metadata' keys
+    Yields:
+        Chunk dicts with 'content' and 'metadata' keys
     """
-    documents = load_documents(docs_path)
-    all_chunks = []
-
-    for doc in documents:
-        chunks = chunk_document(doc["content"], chunk_size, overlap)
+    for doc in load_documents(docs_path):
+        chunks = chunker(doc["content"], chunk_size, overlap)
+        # Chunk metadata ends up in every stored point's payload, so keep only
+        # what results need - not the document's full filesystem path
+        chunk_metadata = {key: value for key, value in doc["metadata"].items() if key != "path"}
         for i, chunk in enumerate(chunks):
-            all_chunks.append({
+            yield {
                 "content": chunk,
                 "metadata": {
-                    **doc["metadata"],
+                    **chunk_metadata,
                     "chunk_index": i,
                     "total_chunks": len(chunks)
                 }
-            })
+            }
+
 
-    return all_chunks
+def process_documents(
+    docs_path: str,
+    chunk_size: int = 500,
+    overlap: int = 100,
+    chunker: Chunker = chunk_document
+) -> List[Dict]:
+    """
+    Load documents and split them into chunks with metadata.
+
+    Args:
+        docs_path: Path to documents directory
+        chunk_size: Size of each chunk
+        overlap: Overlap between chunks
+        chunker: Function that splits one document (see iter_chunks())
+
+    Returns:
+        List of chunk dicts with 'content' and 'metadata' keys
+    """
+    return list(iter_chunks(docs_path, chunk_size, overlap, chunker))
 
 
 if __name__ == "__main__":
@@ -9,25 +9,26 @@ Your Task (Step 7):
 """
 
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Tuple
 from openai import OpenAI
 
 from retriever import search_with_text
 from embeddings import get_client as get_openai_client
 
 
-def build_context(results: List[Dict], max_context_length: int = 3000) -> str:
+def pack_context(results: List[Dict], max_context_length: int = 3000) -> Tuple[str, List[str]]:
     """
-    Build context string from search results.
+    Build the context string and collect the sources that made it in.
 
     Args:
         results: List of search results with 'content' and 'metadata'
         max_context_length: Maximum total context length
 
     Returns:
-        Formatted context string
+        Tuple of (formatted context string, unique sources in rank order)
     """
     context_parts = []
+    sources = []
     total_length = 0
 
     for i, result in enumerate(results, 1):
@@ -36,13 +37,45 @@ def build_context(results: List[Dict], max_context_length: int = 3000) -> str:
 
         part = f"[Source {i}: {source}]\n{content}\n"
 
-        if total_length + len(part) > max_context_length:
+        # Parts are joined with a newline, so every part after the first
+        # costs one extra character of the budget
+        part_length = len(part) + (1 if context_parts else 0)
+
+        if total_length + part_length > max_context_length:
             break
 
         context_parts.append(part)
-        total_length += len(part)
+        sources.append(source)
+        total_length += part_length
+
+    return "\n".join(context_parts), list(dict.fromkeys(sources))
 
-    return "\n".join(context_parts)
+
+def build_context(results: List[Dict], max_context_length: int = 3000) -> str:
+    """
+    Build context string from search results.
+
+    Args:
+        results: List of search results with 'content' and 'metadata'
+        max_context_length: Maximum total context length
+
+    Returns:
+        Formatted context string
+    """
+    return pack_context(results, max_context_length)[0]
+
+
+def build_prompt(question: str, context: str) -> str:
+    """Build the grounded-answer prompt for a question and its context."""
+    return f"""You are a helpful assistant. Answer the question based ONLY on the provided context.
+If the context doesn't contain the answer, say "I don't have enough information to answer this question."
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:"""
 
 
 def answer_question(
@@ -100,19 +133,11 @@ def answer_question(
     # 1. Retrieve relevant chunks
     results = search_with_text(question, top_k)
 
-    # 2. Build context
-    context = build_context(results)
+    # 2. Build context (and note which sources actually fit in it)
+    context, sources = pack_context(results)
 
     # 3. Create prompt
-    prompt = f"""You are a helpful assistant. Answer the question based ONLY on the provided context.
-If the context doesn't contain the answer, say "I don't have enough information to answer this question."
-
-Context:
-{context}
-
-Question: {question}
-
-Answer:"""
+    prompt = build_prompt(question, context)
 
     # 4. Call GPT
     client = get_openai_client()
@@ -124,11 +149,56 @@ Answer:"""
     answer = response.choices[0].message.content
 
     # 5. Return structured response
-    sources = [r.get("metadata", {}).get("source", "Unknown") for r in results]
-
     return {
         "answer": answer,
-        "sources": list(set(sources)),  # Unique sources
+        "sources": sources,  # Unique, in rank order
+        "context_used": context
+    }
+
+
+def _iter_deltas(stream) -> Iterator[str]:
+    """Yield the text pieces of a streamed chat completion."""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def answer_question_stream(
+    question: str,
+    top_k: int = 5,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.3
+) -> Dict:
+    """
+    Answer a question like answer_question(), streaming the answer as it is generated.
+
+    Retrieval happens up front, so the sources are known before the first
+    token arrives.
+
+    Args:
+        question: The user's question
+        top_k: Number of documents to retrieve for context
+        model: OpenAI model to use for generation
+        temperature: Generation temperature (lower = more focused)
+
+    Returns:
+        Dict with 'answer_stream' (iterator of text pieces), 'sources', and
+        'context_used' keys
+    """
+    results = search_with_text(question, top_k)
+    context, sources = pack_context(results)
+
+    client = get_openai_client()
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": build_prompt(question, context)}],
+        temperature=temperature,
+        stream=True
+    )
+
+    return {
+        "answer_stream": _iter_deltas(stream),
+        "sources": sources,
         "context_used": context
     }
 
@@ -8,31 +8,258 @@ Your Task (Step 5 & 6):
 - Implement `search()` to find similar documents
 """
 
+import asyncio
+import functools
+import json
 import os
-from typing import List, Dict, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import threading
+import time
+import uuid
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    VectorParams, Distance, Batch, QueryRequest, HnswConfigDiff, SearchParams,
+    QuantizationSearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType
+)
+
+from embeddings import _event_loop_running, generate_embeddings
 
 
 # Qdrant connection settings
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# gRPC sends vectors as packed float32 protobuf instead of JSON numbers
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() in ("1", "true", "yes")
 COLLECTION_NAME = "documents"
 VECTOR_SIZE = 1536  # text-embedding-3-small dimension
+UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH", "64"))  # Points per upsert request
+UPSERT_CONCURRENCY = int(os.getenv("QDRANT_UPSERT_CONCURRENCY", "4"))  # Upserts in flight
+
+# Search result cache settings (RAG_CACHE_SIZE=0 disables the cache)
+SEARCH_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "256"))
+SEARCH_CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", "0.97"))
+# Seconds a cached result is served; bounds staleness when another process
+# (such as a separate ingestion run) changes the collection
+SEARCH_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "300"))
+
+# Payload keys returned with search hits - everything _to_result() reads
+RESULT_PAYLOAD_FIELDS = ["content", "metadata"]
+
 
+class SearchCache:
+    """
+    Cache of recent search results, keyed by query embedding.
+
+    An identical query is found with a dict lookup. Otherwise the query is
+    compared against all cached queries in a single matrix product, and the
+    cached results are reused when the best cosine similarity reaches the
+    threshold - repeated and rephrased questions then skip Qdrant entirely.
+    The oldest entry is evicted once max_size entries are stored.
 
+    Writes through this process clear the cache, but ingestion in another
+    process can't, so entries also expire ttl seconds after they were stored.
+    """
+
+    def __init__(self, max_size: int, threshold: float, ttl: float = SEARCH_CACHE_TTL):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all cached results (call whenever the collection changes)."""
+        with self._lock:
+            self._vectors = None  # (max_size, dim) unit-length cached queries
+            self._top_ks = np.zeros(max(self.max_size, 0), dtype=np.int64)
+            self._stored_at = np.zeros(max(self.max_size, 0), dtype=np.float64)
+            self._entries: List[Tuple[Tuple[bytes, int], List[Dict]]] = []
+            self._slots: Dict[Tuple[bytes, int], int] = {}
+            self._next = 0
+
+    def get(self, query_embedding, top_k: int) -> Optional[List[Dict]]:
+        """Return cached results for a query, or None on a miss."""
+        if self.max_size <= 0:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            if not self._entries or self._vectors.shape[1] != query.shape[0]:
+                return None
+
+            count = len(self._entries)
+            expired = time.monotonic() - self._stored_at[:count] > self.ttl
+            slot = self._slots.get((query.tobytes(), top_k))
+            if slot is None or expired[slot]:
+                norm = np.linalg.norm(query)
+                if norm == 0:
+                    return None
+                scores = self._vectors[:count] @ (query / norm)
+                # Entries fetched with a smaller top_k can't answer this query
+                scores[self._top_ks[:count] < top_k] = -np.inf
+                scores[expired] = -np.inf
+                slot = int(np.argmax(scores))
+                if scores[slot] < self.threshold:
+                    return None
+
+            results = self._entries[slot][1]
+            return [_copy_result(result) for result in results[:top_k]]
+
+    def put(self, query_embedding, top_k: int, results: List[Dict]) -> None:
+        """Remember the results of a query."""
+        if self.max_size <= 0:
+            return
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        key = (query.tobytes(), top_k)
+        norm = np.linalg.norm(query)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._vectors = np.zeros((self.max_size, query.shape[0]), dtype=np.float32)
+                self._entries, self._slots, self._next = [], {}, 0
+
+            slot = self._next % self.max_size
+            entry = (key, [_copy_result(result) for result in results])
+            if slot < len(self._entries):
+                # Evict the oldest entry
+                old_key = self._entries[slot][0]
+                if self._slots.get(old_key) == slot:
+                    del self._slots[old_key]
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+
+            self._vectors[slot] = query / norm if norm else 0.0
+            self._top_ks[slot] = top_k
+            self._stored_at[slot] = time.monotonic()
+            self._slots[key] = slot
+            self._next += 1
+
+
+def _copy_result(result: Dict) -> Dict:
+    """Copy a result dict and its metadata, so callers can't modify cached entries."""
+    copied = dict(result)
+    if "metadata" in copied:
+        copied["metadata"] = dict(copied["metadata"])
+    return copied
+
+
+_search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_THRESHOLD)
+
+
+def clear_search_cache() -> None:
+    """Forget all cached search results."""
+    _search_cache.clear()
+
+
+def _client_kwargs() -> Dict:
+    """Connection settings shared by the sync and async clients."""
+    return {
+        "host": QDRANT_HOST,
+        "port": QDRANT_PORT,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "timeout": 30,
+    }
+
+
+@functools.lru_cache(maxsize=1)
 def get_client() -> QdrantClient:
-    """Create Qdrant client connection."""
-    return QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    """
+    Get the shared Qdrant client connection.
 
+    The client is created once and reused, so every call shares the same
+    connection pool instead of opening new connections.
+    """
+    return QdrantClient(**_client_kwargs())
+
+
+def _point_batch(
+    ids: List[str],
+    vectors: np.ndarray,
+    payloads: List[Dict],
+    start: int,
+    batch_size: int
+) -> Batch:
+    """Build one columnar upsert batch from a slice of the vector matrix."""
+    end = start + batch_size
+    return Batch(
+        ids=ids[start:end],
+        vectors=vectors[start:end].tolist(),  # One conversion for the whole slice
+        payloads=payloads[start:end]
+    )
+
+
+async def _store_async(
+    ids: List[str],
+    vectors: np.ndarray,
+    payloads: List[Dict],
+    batch_size: int,
+    concurrency: int
+) -> None:
+    """Upsert points in batches over an async client, with several requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    aclient = AsyncQdrantClient(**_client_kwargs())
+
+    async def _upsert(start: int) -> None:
+        async with semaphore:
+            # Build the batch only once it can be sent, so at most
+            # `concurrency` batches of points exist at a time
+            batch = _point_batch(ids, vectors, payloads, start, batch_size)
+            # Concurrent requests may be applied in any order, so each one waits
+            await aclient.upsert(collection_name=COLLECTION_NAME, points=batch, wait=True)
+
+    try:
+        await asyncio.gather(*[_upsert(start) for start in range(0, len(ids), batch_size)])
+    finally:
+        await aclient.close()
+
+
+def _point_id(content: str, metadata: Dict) -> str:
+    """
+    Deterministic point ID for a chunk.
 
-def initialize_collection(client: QdrantClient, recreate: bool = False) -> None:
+    Chunks are identified by (source, chunk_index), so ingesting the same
+    documents again overwrites their points instead of adding duplicates.
+    Chunks without that metadata fall back to a hash of their content and
+    metadata, so equal text from different sources stays separate.
+    """
+    if "source" in metadata and "chunk_index" in metadata:
+        key = f"{metadata['source']}::{metadata['chunk_index']}"
+    else:
+        key = f"{json.dumps(metadata, sort_keys=True, default=str)}::{content}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+
+def _as_list(vector) -> List[float]:
+    """Convert a NumPy embedding row to the plain list the Qdrant models expect."""
+    return vector.tolist() if hasattr(vector, "tolist") else vector
+
+
+def initialize_collection(
+    client: QdrantClient,
+    recreate: bool = False,
+    quantize: bool = True,
+    hnsw_m: int = 32,
+    hnsw_ef_construct: int = 256
+) -> None:
     """
     Initialize the Qdrant collection for document storage.
 
     Args:
         client: Qdrant client instance
         recreate: If True, delete and recreate the collection
+        quantize: If True, let Qdrant keep an int8 copy of the vectors in RAM
+            for faster search (4x smaller than float32) and leave the
+            original float32 vectors on disk for rescoring
+        hnsw_m: Edges per node in the HNSW graph (higher = better recall, more RAM)
+        hnsw_ef_construct: Candidate list size while building the graph
+            (higher = better graph, slower indexing)
     """
     collections = client.get_collections().collections
     collection_names = [c.name for c in collections]
@@ -47,9 +274,24 @@ def initialize_collection(client: QdrantClient, recreate: bool = False) -> None:
         collection_name=COLLECTION_NAME,
         vectors_config=VectorParams(
             size=VECTOR_SIZE,
-            distance=Distance.COSINE
-        )
+            # Qdrant normalizes vectors once on upload for COSINE and then
+            # scores with a plain dot product, so switching to DOT with
+            # client-side normalization would not make search any cheaper
+            distance=Distance.COSINE,
+            # Only the int8 copy needs to stay in RAM; the full vectors
+            # are read from mmap when the top hits are rescored
+            on_disk=quantize
+        ),
+        quantization_config=ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,  # Clip outliers so they don't stretch the int8 range
+                always_ram=True
+            )
+        ) if quantize else None,
+        hnsw_config=HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct, on_disk=False)
     )
+    clear_search_cache()
     print(f"Created collection: {COLLECTION_NAME}")
 
 
@@ -77,38 +319,135 @@ def store_embeddings(chunks: List[Dict], client: Optional[QdrantClient] = None)
     Hints:
         - Use get_client() if client is None
         - Call initialize_collection() first
-        - Create PointStruct objects for each chunk
+        - Create PointStruct objects for each chunk (or one columnar Batch)
         - Use client.upsert(collection_name=COLLECTION_NAME, points=points)
-        - PointStruct needs: id (int), vector (list), payload (dict with content + metadata)
+        - PointStruct needs: id (int or UUID string), vector (list),
+          payload (dict with content + metadata)
     """
     if not chunks:
         return 0
 
+    return store_embedding_matrix(
+        [chunk["content"] for chunk in chunks],
+        np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32),
+        [chunk.get("metadata", {}) for chunk in chunks],
+        client
+    )
+
+
+def store_embedding_matrix(
+    contents: List[str],
+    vectors: np.ndarray,
+    metadatas: Optional[List[Dict]] = None,
+    client: Optional[QdrantClient] = None
+) -> int:
+    """
+    Store chunks given as parallel columns, with all embeddings in one matrix.
+
+    Same as store_embeddings(), for callers that already hold the vectors
+    as an array (such as a generate_embedding_matrix() result).
+
+    Args:
+        contents: Chunk texts
+        vectors: (n, VECTOR_SIZE) array with one embedding row per chunk
+        metadatas: Metadata dict per chunk (default: empty metadata)
+        client: Optional Qdrant client (creates new one if not provided)
+
+    Returns:
+        Number of distinct points stored (chunks with the same ID count once)
+
+    Raises:
+        ValueError: If the columns have different lengths
+    """
+    if metadatas is None:
+        metadatas = [{}] * len(contents)
+    if not len(contents) == len(vectors) == len(metadatas):
+        raise ValueError(
+            f"Got {len(contents)} contents, {len(vectors)} vectors and "
+            f"{len(metadatas)} metadata dicts - they must line up"
+        )
+    if not contents:
+        return 0
+
+    # Only our own client is swapped for the async one - a caller's client
+    # may point somewhere else (e.g. an in-memory instance)
+    use_async = client is None
+
     if client is None:
         client = get_client()
 
     initialize_collection(client)
 
-    points = []
-    for i, chunk in enumerate(chunks):
-        point = PointStruct(
-            id=i,
-            vector=chunk["embedding"],
-            payload={
-                "content": chunk["content"],
-                "metadata": chunk.get("metadata", {})
-            }
+    ids = [_point_id(content, metadata) for content, metadata in zip(contents, metadatas)]
+    # One contiguous float32 matrix; rows are only expanded into lists of
+    # Python floats one upsert batch at a time
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    # Chunks sharing an ID would overwrite each other - keep the last one,
+    # as a later upsert would, so the returned count matches the points
+    last_index = {point_id: i for i, point_id in enumerate(ids)}
+    if len(last_index) < len(ids):
+        keep = sorted(last_index.values())
+        ids = [ids[i] for i in keep]
+        contents = [contents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+        vectors = vectors[keep]
+
+    payloads = [
+        {"content": content, "metadata": metadata}
+        for content, metadata in zip(contents, metadatas)
+    ]
+
+    if (use_async and UPSERT_CONCURRENCY > 1 and len(ids) > UPSERT_BATCH_SIZE
+            and not _event_loop_running()):
+        asyncio.run(_store_async(ids, vectors, payloads, UPSERT_BATCH_SIZE, UPSERT_CONCURRENCY))
+        clear_search_cache()
+        return len(ids)
+
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        # Only wait on the last batch: updates are applied in order, so once
+        # it is done every earlier batch is searchable too
+        is_last = start + UPSERT_BATCH_SIZE >= len(ids)
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=_point_batch(ids, vectors, payloads, start, UPSERT_BATCH_SIZE),
+            wait=is_last
         )
-        points.append(point)
-
-    client.upsert(collection_name=COLLECTION_NAME, points=points)
-    return len(points)
+    clear_search_cache()
+    return len(ids)
+
+
+def _to_result(point) -> Dict:
+    """Convert a scored Qdrant point into a result dict."""
+    return {
+        "content": point.payload["content"],
+        "metadata": point.payload.get("metadata", {}),
+        "score": point.score
+    }
+
+
+def _search_params(
+    search_ef: Optional[int],
+    oversampling: Optional[float]
+) -> Optional[SearchParams]:
+    """Build per-query search params, or None to use the collection defaults."""
+    if search_ef is None and oversampling is None:
+        return None
+    quantization = None
+    if oversampling is not None:
+        # Fetch oversampling * top_k candidates from the int8 index, then
+        # rank them again with the original float32 vectors
+        quantization = QuantizationSearchParams(rescore=True, oversampling=oversampling)
+    return SearchParams(hnsw_ef=search_ef, quantization=quantization)
 
 
 def search(
     query_embedding: List[float],
     top_k: int = 5,
-    client: Optional[QdrantClient] = None
+    client: Optional[QdrantClient] = None,
+    search_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    with_payload: bool = True
 ) -> List[Dict]:
     """
     Search for similar documents using a query embedding.
@@ -119,9 +458,18 @@ def search(
         query_embedding: The embedding vector of the query
         top_k: Number of results to return (default: 5)
         client: Optional Qdrant client
+        search_ef: HNSW candidate list size for this query (higher = better
+            recall, slower search; default: the collection's setting)
+        oversampling: On a quantized collection, fetch this many times top_k
+            int8 candidates and rescore them with the full vectors
+            (default: Qdrant's setting)
+        with_payload: If False, skip fetching the payload and return only
+            scores - for callers that just need the ranking
 
     Returns:
         List of result dicts with 'content', 'metadata', and 'score' keys
+        (only 'score' when with_payload is False). Searches on the default
+        client may be answered from the search cache.
 
     Example:
         >>> query_emb = [0.1] * 1536
@@ -137,23 +485,35 @@ def search(
         - Each result has .payload (dict) and .score (float)
         - Extract content and metadata from payload
     """
+    # Only cache searches on our own client - a caller's client may point
+    # at a different collection state. Custom search params ask for a
+    # specific recall, which a cached answer can't promise.
+    use_cache = (client is None and search_ef is None and oversampling is None
+                 and with_payload)
+    if use_cache:
+        cached = _search_cache.get(query_embedding, top_k)
+        if cached is not None:
+            return cached
+
     if client is None:
         client = get_client()
 
     results = client.query_points(
         collection_name=COLLECTION_NAME,
         query=query_embedding,
-        limit=top_k
+        limit=top_k,
+        search_params=_search_params(search_ef, oversampling),
+        with_payload=RESULT_PAYLOAD_FIELDS if with_payload else False,
+        with_vectors=False
     )
 
-    processed = []
-    for result in results.points:
-        processed.append({
-            "content": result.payload["content"],
-            "metadata": result.payload.get("metadata", {}),
-            "score": result.score
-        })
+    if not with_payload:
+        return [{"score": point.score} for point in results.points]
 
+    processed = [_to_result(point) for point in results.points]
+
+    if use_cache:
+        _search_cache.put(query_embedding, top_k, processed)
     return processed
 
 
@@ -168,15 +528,89 @@ def search_with_text(query: str, top_k: int = 5) -> List[Dict]:
     Returns:
         List of search results
     """
-    from embeddings import generate_embeddings
-
     query_embedding = generate_embeddings([query])[0]
     return search(query_embedding, top_k)
 
 
+def search_batch(
+    query_embeddings: List[List[float]],
+    top_k: int = 5,
+    client: Optional[QdrantClient] = None,
+    search_ef: Optional[int] = None,
+    oversampling: Optional[float] = None
+) -> List[List[Dict]]:
+    """
+    Search for several query embeddings in a single request.
+
+    Args:
+        query_embeddings: The embedding vectors of the queries
+        top_k: Number of results to return per query (default: 5)
+        client: Optional Qdrant client
+        search_ef: HNSW candidate list size for each query (see search())
+        oversampling: Quantized candidate oversampling for each query (see search())
+
+    Returns:
+        One list of result dicts (as returned by search()) per query, in order.
+        Like search(), batches on the default client go through the search cache.
+    """
+    if len(query_embeddings) == 0:
+        return []
+
+    # Same caching rules as search()
+    use_cache = client is None and search_ef is None and oversampling is None
+    if use_cache:
+        batch_results = [_search_cache.get(embedding, top_k) for embedding in query_embeddings]
+    else:
+        batch_results = [None] * len(query_embeddings)
+
+    misses = [i for i, results in enumerate(batch_results) if results is None]
+    if not misses:
+        return batch_results
+
+    if client is None:
+        client = get_client()
+
+    responses = client.query_batch_points(
+        collection_name=COLLECTION_NAME,
+        requests=[
+            QueryRequest(
+                query=_as_list(query_embeddings[i]),
+                limit=top_k,
+                params=_search_params(search_ef, oversampling),
+                with_payload=RESULT_PAYLOAD_FIELDS,
+                with_vector=False
+            )
+            for i in misses
+        ]
+    )
+
+    for i, response in zip(misses, responses):
+        batch_results[i] = [_to_result(point) for point in response.points]
+        if use_cache:
+            _search_cache.put(query_embeddings[i], top_k, batch_results[i])
+    return batch_results
+
+
+def search_batch_with_text(queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+    """
+    Search using several text queries, with one embeddings call and one search request.
+
+    Args:
+        queries: Text query strings
+        top_k: Number of results per query
+
+    Returns:
+        One list of search results per query, in order
+    """
+    return search_batch(generate_embeddings(queries), top_k)
+
+
 if __name__ == "__main__":
     # Test connection to Qdrant
-    print(f"Connecting to Qdrant at {QDRANT_HOST}:{QDRANT_PORT}...")
+    if QDRANT_PREFER_GRPC:
+        print(f"Connecting to Qdrant at {QDRANT_HOST}:{QDRANT_GRPC_PORT} (gRPC)...")
+    else:
+        print(f"Connecting to Qdrant at {QDRANT_HOST}:{QDRANT_PORT} (REST)...")
 
     try:
         client = get_client()
@@ -9,13 +9,30 @@ Then open: http://localhost:7860
 
 import gradio as gr
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Iterator
 
 # Add src directory to path if needed
 sys.path.insert(0, str(Path(__file__).parent))
 
-from qa_chain import answer_question
-from retriever import get_client, COLLECTION_NAME
+from qa_chain import answer_question_stream
+from retriever import (
+    get_client, search_batch_with_text, COLLECTION_NAME, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+)
+
+# Example questions shown under the chat box
+EXAMPLES = [
+    "How do I reset my password?",
+    "What's included in the Pro plan?",
+    "My account is locked, what do I do?",
+    "How do I create a task via the API?",
+    "What's the rate limit for API requests?",
+    "Does TechFlow have a mobile app?",
+    "How do I set up Slack integration?",
+    "What file types can I upload?",
+]
 
 
 def check_system_ready() -> bool:
@@ -28,25 +45,64 @@ def check_system_ready() -> bool:
         return False
 
 
-def ask_question(question: str, history: list) -> tuple:
+def warm_example_cache(top_k: int = 5) -> None:
+    """
+    Run the example questions so clicking them skips retrieval.
+
+    Their embeddings land in the embedding cache and their results in the
+    search cache, using one embeddings call and one batched search. Search
+    cache entries expire after RAG_CACHE_TTL seconds; see keep_examples_warm().
     """
-    Process a question and return the answer with sources.
+    try:
+        search_batch_with_text(EXAMPLES, top_k=top_k)
+    except Exception as e:
+        # Only a speed-up - the examples still work without it
+        print(f"Could not preload example questions: {e}")
+
+
+def keep_examples_warm(top_k: int = 5) -> None:
+    """
+    Preload the example questions now, then again each time their entries expire.
+
+    The refresh also picks up documents ingested by another process since
+    the last one. It runs on a daemon thread, so it never blocks shutdown.
+    """
+    warm_example_cache(top_k)
+    if SEARCH_CACHE_SIZE <= 0 or SEARCH_CACHE_TTL <= 0:
+        return  # Nothing is kept in the search cache to refresh
+
+    def refresh() -> None:
+        while True:
+            # Wait until the entries have expired: search_batch() serves
+            # unexpired ones from the cache without storing them again
+            time.sleep(SEARCH_CACHE_TTL + 1)
+            warm_example_cache(top_k)
+
+    threading.Thread(target=refresh, name="warm-examples", daemon=True).start()
+
+
+def ask_question(question: str, history: list) -> Iterator[tuple]:
+    """
+    Process a question and stream the answer with sources.
 
     Args:
         question: User's question
         history: Chat history in Gradio 6.x message format
 
-    Returns:
-        Tuple of (history, sources_text)
+    Yields:
+        Tuples of (history, sources_text), once per streamed piece of the answer
     """
     if not question.strip():
-        return history, ""
+        yield history, ""
+        return
+
+    # Add to history using Gradio 6.x message format
+    history = history + [{"role": "user", "content": question}]
+    answer = ""
 
     try:
         # Get answer from RAG system
-        result = answer_question(question, top_k=5)
-
-        answer = result["answer"]
+        result = answer_question_stream(question, top_k=5)
         sources = result.get("sources", [])
 
         # Format sources
@@ -55,17 +111,18 @@ def ask_question(question: str, history: list) -> tuple:
         else:
             sources_text = ""
 
-        # Add to history using Gradio 6.x message format
-        history.append({"role": "user", "content": question})
-        history.append({"role": "assistant", "content": answer})
+        for delta in result["answer_stream"]:
+            answer += delta
+            yield history + [{"role": "assistant", "content": answer}], sources_text
 
-        return history, sources_text
+        if not answer:
+            yield history + [{"role": "assistant", "content": answer}], sources_text
 
     except Exception as e:
         error_msg = f"Error: {str(e)}"
-        history.append({"role": "user", "content": question})
-        history.append({"role": "assistant", "content": error_msg})
-        return history, ""
+        if answer:
+            error_msg = f"{answer}\n\n{error_msg}"
+        yield history + [{"role": "assistant", "content": error_msg}], ""
 
 
 def create_demo():
@@ -73,6 +130,8 @@ def create_demo():
 
     # Check if system is ready
     system_ready = check_system_ready()
+    if system_ready:
+        keep_examples_warm()
 
     with gr.Blocks(title="TechFlow Support Bot") as demo:
 
@@ -121,16 +180,7 @@ def create_demo():
 
         # Example questions
         gr.Examples(
-            examples=[
-                "How do I reset my password?",
-                "What's included in the Pro plan?",
-                "My account is locked, what do I do?",
-                "How do I create a task via the API?",
-                "What's the rate limit for API requests?",
-                "Does TechFlow have a mobile app?",
-                "How do I set up Slack integration?",
-                "What file types can I upload?",
-            ],
+            examples=EXAMPLES,
             inputs=question_input,
             label="Example Questions",
         )
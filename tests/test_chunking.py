@@ -10,10 +10,14 @@ import pytest
 import sys
 from pathlib import Path
 
-# Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+# Add src directory to Python path when run directly (conftest does it under pytest)
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
 
-from ingest import chunk_document, load_documents, process_documents
+from ingest import (
+    chunk_document, chunk_document_tokens, load_documents, process_documents, _get_encoding
+)
 
 # Get the path to sample_docs relative to test file
 SAMPLE_DOCS_PATH = str(Path(__file__).parent.parent / 'data' / 'sample_docs')
@@ -86,6 +90,73 @@ class TestChunkDocument:
         assert 5 <= len(chunks) <= 10, \
             f"Expected 5-10 chunks, got {len(chunks)}"
 
+    def test_no_overlap(self):
+        """Test that overlap=0 splits content into back-to-back chunks."""
+        text = "ABCDEFGHIJ" * 25
+        chunks = chunk_document(text, chunk_size=100, overlap=0)
+
+        assert len(chunks) == 3, f"Expected 3 chunks, got {len(chunks)}"
+        assert "".join(chunks) == text, "Chunks should reassemble the original text"
+
+    def test_invalid_overlap(self):
+        """Test that an overlap not smaller than chunk_size is rejected."""
+        with pytest.raises(ValueError):
+            chunk_document("A" * 1000, chunk_size=100, overlap=100)
+
+    def test_large_input(self):
+        """Test that a large document chunks losslessly."""
+        text = "abcdefghij" * 200_000  # 2 MB of text
+        chunks = chunk_document(text, chunk_size=500, overlap=50)
+
+        assert "".join(chunk[50:] if i else chunk for i, chunk in enumerate(chunks)) == text, \
+            "Chunks minus their overlap should rebuild the text"
+
+
+class TestChunkDocumentTokens:
+    """Tests for the token-based chunk_document_tokens function."""
+
+    @pytest.fixture(autouse=True)
+    def encoding(self):
+        """Load the tokenizer, skipping if its data can't be downloaded."""
+        try:
+            return _get_encoding("text-embedding-3-small")
+        except Exception as e:
+            pytest.skip(f"tiktoken encoding not available: {e}")
+
+    def test_chunks_respect_token_limit(self, encoding):
+        """Test that no chunk exceeds the token budget."""
+        text = "The quick brown fox jumps over the lazy dog. " * 200
+        chunks = chunk_document_tokens(text, chunk_size=100, overlap=20)
+
+        assert len(chunks) > 1, "Should create multiple chunks for long text"
+        assert all(len(encoding.encode(chunk)) <= 100 for chunk in chunks), \
+            "No chunk should exceed chunk_size tokens"
+
+    def test_multibyte_characters_stay_whole(self, encoding):
+        """Test that chunks never split a CJK character or emoji into U+FFFD."""
+        text = "機械学習はデータから学ぶ。😀🎉 深層学習 🚀 " * 50
+        chunks = chunk_document_tokens(text, chunk_size=7, overlap=0)
+
+        assert all("\ufffd" not in chunk for chunk in chunks), \
+            "No chunk should contain replacement characters"
+        assert all(len(encoding.encode(chunk)) <= 7 for chunk in chunks), \
+            "No chunk should exceed chunk_size tokens"
+        assert "".join(chunks) == text, "Chunks without overlap should rebuild the text"
+
+    def test_short_and_empty_content(self):
+        """Test that short text stays whole and empty text gives no chunks."""
+        assert chunk_document_tokens("Hello world.") == ["Hello world."]
+        assert chunk_document_tokens("") == []
+
+    def test_process_documents_by_tokens(self):
+        """Test that process_documents accepts the token chunker."""
+        chunks = process_documents(
+            SAMPLE_DOCS_PATH, chunk_size=200, overlap=20, chunker=chunk_document_tokens
+        )
+
+        assert len(chunks) > 0, "Should create chunks"
+        assert all("chunk_index" in chunk["metadata"] for chunk in chunks)
+
 
 class TestLoadDocuments:
     """Tests for document loading."""
@@ -98,6 +169,13 @@ class TestLoadDocuments:
         assert all("content" in d for d in docs), "Each doc should have content"
         assert all("metadata" in d for d in docs), "Each doc should have metadata"
 
+    def test_crlf_newlines_normalized(self, tmp_path):
+        """Test that CRLF files load with LF newlines, as on a Windows checkout."""
+        (tmp_path / "doc.txt").write_bytes(b"line one\r\nline two\r\n")
+        docs = load_documents(str(tmp_path))
+
+        assert docs[0]["content"] == "line one\nline two\n"
+
 
 class TestProcessDocuments:
     """Tests for full document processing pipeline."""
@@ -112,6 +190,8 @@ class TestProcessDocuments:
             assert "metadata" in chunk, "Each chunk should have metadata"
             assert "source" in chunk["metadata"], "Metadata should include source"
             assert "chunk_index" in chunk["metadata"], "Metadata should include chunk_index"
+            assert "path" not in chunk["metadata"], \
+                "Chunk metadata should not repeat the document path"
 
 
 if __name__ == "__main__":
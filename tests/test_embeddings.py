@@ -8,11 +8,19 @@ Run with: pytest tests/test_embeddings.py -v
 Note: These tests require a valid OPENAI_API_KEY environment variable.
 """
 
+import asyncio
+import numpy as np
 import pytest
 import os
 import sys
-sys.path.insert(0, '../src')
+from pathlib import Path
 
+# Add src directory to Python path when run directly (conftest does it under pytest)
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import embeddings as embeddings_module
 from embeddings import generate_embeddings, embed_chunks
 
 
@@ -68,15 +76,13 @@ class TestGenerateEmbeddings:
         ]
         embeddings = generate_embeddings(texts)
 
-        # Calculate cosine similarity
-        def cosine_sim(a, b):
-            dot = sum(x * y for x, y in zip(a, b))
-            norm_a = sum(x * x for x in a) ** 0.5
-            norm_b = sum(x * x for x in b) ** 0.5
-            return dot / (norm_a * norm_b)
+        # Cosine similarity of every pair in one matrix product
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        similarity = vectors @ vectors.T
 
-        sim_similar = cosine_sim(embeddings[0], embeddings[1])
-        sim_different = cosine_sim(embeddings[0], embeddings[2])
+        sim_similar = similarity[0, 1]
+        sim_different = similarity[0, 2]
 
         assert sim_similar > sim_different, \
             "Similar texts should have higher cosine similarity"
@@ -88,6 +94,42 @@ class TestGenerateEmbeddings:
 
         assert len(embeddings) == 150, "Should return all 150 embeddings"
 
+    def test_batching_inside_event_loop(self):
+        """Test that batched embedding also works when called from async code."""
+        texts = [f"Async text number {i}" for i in range(150)]
+
+        async def embed():
+            return generate_embeddings(texts, batch_size=50)
+
+        embeddings = asyncio.run(embed())
+        assert len(embeddings) == 150, "Should return all 150 embeddings"
+
+
+class TestEmbeddingCache:
+    """Tests for the on-disk embedding cache (disabled for the other tests)."""
+
+    def test_cached_texts_skip_the_api(self, monkeypatch, tmp_path):
+        """Test that a repeated call is served from the cache without API calls."""
+        monkeypatch.setattr(embeddings_module, "EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+        texts = ["Cache me once", "Cache me twice"]
+        first = generate_embeddings(texts)
+
+        def no_api(*args, **kwargs):
+            raise AssertionError("Cached texts should not reach the API")
+
+        monkeypatch.setattr(embeddings_module, "_embed_uncached", no_api)
+        second = generate_embeddings(texts)
+
+        assert np.allclose(first, second), "Cached embeddings should match the originals"
+
+    def test_unusable_cache_falls_back_to_api(self, monkeypatch, tmp_path):
+        """Test that a cache path that can't be opened doesn't stop embedding."""
+        # A directory can't be opened as a SQLite database
+        monkeypatch.setattr(embeddings_module, "EMBEDDING_CACHE_PATH", str(tmp_path))
+        embeddings = generate_embeddings(["No cache available"])
+
+        assert len(embeddings) == 1, "Should still return the embedding"
+
 
 class TestEmbedChunks:
     """Tests for the embed_chunks helper function."""
@@ -14,9 +14,14 @@ Note: These tests require:
 import pytest
 import os
 import sys
-sys.path.insert(0, '../src')
+from pathlib import Path
 
-from qa_chain import answer_question, build_context
+# Add src directory to Python path when run directly (conftest does it under pytest)
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from qa_chain import answer_question, answer_question_stream, build_context, pack_context
 
 
 # Check prerequisites
@@ -28,7 +33,7 @@ def prerequisites_met():
         client = get_client()
         client.get_collections()
         return True
-    except:
+    except Exception:  # Not KeyboardInterrupt/SystemExit - Ctrl+C must still work
         return False
 
 
@@ -72,6 +77,31 @@ class TestBuildContext:
         context = build_context([])
         assert context == "", "Empty results should produce empty context"
 
+    def test_pack_context_sources(self):
+        """Test that sources are unique, ranked, and limited to the packed context."""
+        results = [
+            {"content": "A" * 100, "metadata": {"source": "b.txt"}},
+            {"content": "B" * 100, "metadata": {"source": "a.txt"}},
+            {"content": "C" * 100, "metadata": {"source": "b.txt"}},
+            {"content": "D" * 1000, "metadata": {"source": "c.txt"}}
+        ]
+
+        context, sources = pack_context(results, max_context_length=500)
+
+        assert sources == ["b.txt", "a.txt"], \
+            "Sources should be deduplicated in rank order and skip unused results"
+        assert context == build_context(results, max_context_length=500)
+
+    def test_build_context_large_inputs(self):
+        """Test that packing many results keeps them all when they fit the budget."""
+        results = [
+            {"content": "X" * 1000, "metadata": {"source": f"doc{i}.txt"}}
+            for i in range(10_000)
+        ]
+        context = build_context(results, max_context_length=100_000_000)
+
+        assert context.count("[Source ") == 10_000, "All results should fit the budget"
+
 
 class TestAnswerQuestion:
     """Tests for the answer_question function."""
@@ -91,6 +121,14 @@ class TestAnswerQuestion:
 
         assert len(result["answer"]) > 0, "Answer should not be empty"
 
+    def test_answer_stream(self):
+        """Test that the streamed answer has the same structure and is not empty."""
+        result = answer_question_stream("Tell me something from the documents.")
+
+        assert isinstance(result["sources"], list), "Sources should be a list"
+        answer = "".join(result["answer_stream"])
+        assert len(answer) > 0, "Streamed answer should not be empty"
+
     def test_answer_includes_sources(self):
         """Test that sources are provided when available."""
         result = answer_question("What information is in the documents?")
@@ -8,31 +8,130 @@ Run with: pytest tests/test_retriever.py -v
 Note: These tests require Qdrant to be running (docker-compose up -d)
 """
 
+import functools
+from contextlib import closing
+
+import numpy as np
 import pytest
 import os
+import re
+import socket
 import sys
-sys.path.insert(0, '../src')
+from pathlib import Path
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FilterSelector, ScalarType, SearchParams
 
+# Add src directory to Python path when run directly (conftest does it under pytest)
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import retriever
 from retriever import (
-    get_client, initialize_collection, store_embeddings, search,
-    COLLECTION_NAME, VECTOR_SIZE
+    get_client, initialize_collection, store_embeddings, store_embedding_matrix,
+    search, search_batch,
+    clear_search_cache, VECTOR_SIZE,
+    QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT
 )
 
 
+def _test_client() -> QdrantClient:
+    """Qdrant client for test setup that always talks gRPC, whatever QDRANT_PREFER_GRPC says."""
+    return QdrantClient(
+        host=QDRANT_HOST, port=QDRANT_PORT, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=True
+    )
+
+
 # Check if Qdrant is available
+@functools.lru_cache(maxsize=1)
 def qdrant_available():
+    # A TCP connect to the gRPC port is enough to tell whether Qdrant is up
+    # and fails fast when it isn't. Set QDRANT_TEST_FULL_CHECK=1 to make a
+    # real request instead.
+    if os.getenv("QDRANT_TEST_FULL_CHECK"):
+        try:
+            with closing(_test_client()) as client:
+                client.get_collections()
+            return True
+        except Exception:
+            return False
+
     try:
-        client = get_client()
-        client.get_collections()
-        return True
-    except:
+        with socket.create_connection((QDRANT_HOST, QDRANT_GRPC_PORT), timeout=0.1):
+            return True
+    except OSError:
         return False
 
 
-pytestmark = pytest.mark.skipif(
-    not qdrant_available(),
-    reason="Qdrant not available - run 'docker-compose up -d'"
-)
+def _vector(*head: float) -> np.ndarray:
+    """A read-only float32 test vector starting with the given values, zero elsewhere."""
+    vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+    vector[:len(head)] = head
+    vector.setflags(write=False)  # Shared between tests, so never modified
+    return vector
+
+
+def _is_desc(values) -> bool:
+    """Check that values never increase, in one pass without sorting a copy."""
+    return all(a >= b for a, b in zip(values, values[1:]))
+
+
+# Test vectors, built once instead of as Python lists in every test
+ML_VECTOR = _vector(0.9, 0.1)
+DL_VECTOR = _vector(0.8, 0.2)
+COOKING_VECTOR = _vector(0.0, 0.0, 0.9)
+ML_QUERY = _vector(0.85, 0.15)
+COOKING_QUERY = _vector(0.0, 0.1, 0.9)
+MIXED_QUERY = _vector(0.5, 0.3, 0.2)
+X_AXIS = _vector(1.0)
+Y_AXIS = _vector(0.0, 1.0)
+UNIFORM_VECTOR = np.full(VECTOR_SIZE, 0.1, dtype=np.float32)
+SCALED_VECTORS = np.arange(1, 6, dtype=np.float32)[:, None] * UNIFORM_VECTOR  # Rows 0.1 .. 0.5
+UNIFORM_VECTOR.setflags(write=False)
+SCALED_VECTORS.setflags(write=False)
+
+
+pytestmark = [
+    pytest.mark.skipif(
+        not qdrant_available(),
+        reason="Qdrant not available - run 'docker-compose up -d'"
+    ),
+    # Tests run against a per-worker collection (see conftest.py); refer to
+    # it as retriever.COLLECTION_NAME, which the fixture patches
+    pytest.mark.usefixtures("worker_collection"),
+]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One gRPC Qdrant client shared by every test, closed at the end of the run."""
+    client = _test_client()
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def collection(client, worker_collection):
+    """Create the test collection once for the whole module."""
+    initialize_collection(client, recreate=True)
+    return client
+
+
+def _delete_all_points(client: QdrantClient) -> None:
+    """Empty the test collection, keeping the collection and its index."""
+    client.delete(
+        collection_name=retriever.COLLECTION_NAME,
+        points_selector=FilterSelector(filter=Filter())
+    )
+    clear_search_cache()
+
+
+@pytest.fixture
+def empty_collection(collection):
+    """Delete all points before a test."""
+    _delete_all_points(collection)
+    return collection
 
 
 class TestQdrantConnection:
@@ -44,32 +143,29 @@ class TestQdrantConnection:
         collections = client.get_collections()
         assert collections is not None, "Should get collections response"
 
-    def test_initialize_collection(self):
+    def test_initialize_collection(self, client):
         """Test collection initialization."""
-        client = get_client()
         initialize_collection(client, recreate=True)
 
         collections = client.get_collections().collections
         collection_names = [c.name for c in collections]
 
-        assert COLLECTION_NAME in collection_names, \
-            f"Collection '{COLLECTION_NAME}' should exist"
+        assert retriever.COLLECTION_NAME in collection_names, \
+            f"Collection '{retriever.COLLECTION_NAME}' should exist"
 
 
 class TestStoreEmbeddings:
     """Tests for the store_embeddings function."""
 
     @pytest.fixture(autouse=True)
-    def setup(self):
-        """Reset collection before each test."""
-        client = get_client()
-        initialize_collection(client, recreate=True)
+    def setup(self, empty_collection):
+        """Start each test with an empty collection."""
 
     def test_store_single_chunk(self):
         """Test storing a single chunk."""
         chunks = [{
             "content": "This is test content.",
-            "embedding": [0.1] * VECTOR_SIZE,
+            "embedding": UNIFORM_VECTOR,
             "metadata": {"source": "test.txt", "chunk_index": 0}
         }]
 
@@ -81,7 +177,7 @@ class TestStoreEmbeddings:
         chunks = [
             {
                 "content": f"Content {i}",
-                "embedding": [0.1 * (i + 1)] * VECTOR_SIZE,
+                "embedding": SCALED_VECTORS[i],
                 "metadata": {"source": "test.txt", "chunk_index": i}
             }
             for i in range(5)
@@ -95,87 +191,293 @@ class TestStoreEmbeddings:
         count = store_embeddings([])
         assert count == 0, "Should store 0 points for empty input"
 
+    def test_store_embedding_matrix(self, collection):
+        """Test storing chunks given as columns with an embedding matrix."""
+        contents = [f"Content {i}" for i in range(5)]
+        metadatas = [{"source": "test.txt", "chunk_index": i} for i in range(5)]
 
-class TestSearch:
-    """Tests for the search function."""
+        count = store_embedding_matrix(contents, SCALED_VECTORS, metadatas)
+        assert count == 5, "Should store 5 points"
+        assert collection.count(retriever.COLLECTION_NAME, exact=True).count == 5
+
+    def test_same_content_without_chunk_index(self, collection):
+        """Test that equal text from different sources is stored as separate points."""
+        contents = ["Same text", "Same text", "Same text"]
+        metadatas = [{"source": "a.txt"}, {"source": "b.txt"}, {"source": "a.txt"}]
+
+        count = store_embedding_matrix(contents, SCALED_VECTORS[:3], metadatas)
+        assert count == 2, "Only the two distinct sources should be stored"
+        assert collection.count(retriever.COLLECTION_NAME, exact=True).count == 2
+
+    def test_store_embedding_matrix_mismatch(self):
+        """Test that columns of different lengths are rejected."""
+        with pytest.raises(ValueError):
+            store_embedding_matrix(["Only one"], SCALED_VECTORS)
+
+    def test_store_concurrent_batches(self, collection, monkeypatch):
+        """Test that chunks spanning several upsert batches are all stored concurrently."""
+        # Small batches keep the test fast while still taking the concurrent path
+        monkeypatch.setattr(retriever, "UPSERT_BATCH_SIZE", 4)
+        monkeypatch.setattr(retriever, "UPSERT_CONCURRENCY", 2)
+        chunks = [
+            {
+                "content": f"Batched chunk {i}",
+                "embedding": SCALED_VECTORS[i % 5],
+                "metadata": {"source": "batches.txt", "chunk_index": i}
+            }
+            for i in range(10)
+        ]
 
-    @pytest.fixture(autouse=True)
-    def setup_data(self):
-        """Set up test data before each test."""
-        client = get_client()
-        initialize_collection(client, recreate=True)
+        count = store_embeddings(chunks)
+        assert count == 10, "Should store 10 points"
+        assert collection.count(retriever.COLLECTION_NAME, exact=True).count == 10
 
-        # Store test documents with different topics
+    def test_reingest_is_idempotent(self, collection):
+        """Test that storing the same chunks twice does not duplicate them."""
         chunks = [
             {
-                "content": "Machine learning is a subset of artificial intelligence.",
-                "embedding": [0.9, 0.1, 0.0] + [0.0] * (VECTOR_SIZE - 3),
-                "metadata": {"source": "ml.txt", "chunk_index": 0}
-            },
-            {
-                "content": "Deep learning uses neural networks with many layers.",
-                "embedding": [0.8, 0.2, 0.0] + [0.0] * (VECTOR_SIZE - 3),
-                "metadata": {"source": "dl.txt", "chunk_index": 0}
-            },
-            {
-                "content": "Cooking pasta requires boiling water and salt.",
-                "embedding": [0.0, 0.0, 0.9] + [0.0] * (VECTOR_SIZE - 3),
-                "metadata": {"source": "cooking.txt", "chunk_index": 0}
+                "content": f"Content {i}",
+                "embedding": SCALED_VECTORS[i],
+                "metadata": {"source": "test.txt", "chunk_index": i}
             }
+            for i in range(3)
         ]
-        store_embeddings(chunks)
-
-    def test_search_returns_results(self):
-        """Test that search returns results."""
-        query_embedding = [0.85, 0.15, 0.0] + [0.0] * (VECTOR_SIZE - 3)
-        results = search(query_embedding, top_k=2)
 
-        assert len(results) == 2, "Should return 2 results"
+        store_embeddings(chunks)
+        store_embeddings(chunks)
+        count = collection.count(retriever.COLLECTION_NAME, exact=True).count
+        assert count == 3, "Re-ingesting should overwrite points, not add new ones"
+
+
+# Topic matchers for the relevance checks
+ML_RE = re.compile(r"machine\s+learning|deep\s+learning", re.IGNORECASE)
+COOKING_RE = re.compile(r"cooking|pasta", re.IGNORECASE)
+
+# HNSW candidate list size for test searches: three well-separated
+# documents don't need Qdrant's default, much wider search
+TEST_SEARCH_EF = 8
+
+# Queries answered by the single batched search shared by TestSearch
+SEARCH_QUERIES = {
+    "ml": ML_QUERY,
+    "cooking": COOKING_QUERY,
+    "mixed": MIXED_QUERY,
+    "uniform": UNIFORM_VECTOR,
+}
+
+
+# Test documents with different topics, stored as one embedding matrix
+SEARCH_CONTENTS = [
+    "Machine learning is a subset of artificial intelligence.",
+    "Deep learning uses neural networks with many layers.",
+    "Cooking pasta requires boiling water and salt.",
+]
+SEARCH_VECTORS = np.stack([ML_VECTOR, DL_VECTOR, COOKING_VECTOR])
+SEARCH_VECTORS.setflags(write=False)
+SEARCH_METADATAS = [
+    {"source": "ml.txt", "chunk_index": 0},
+    {"source": "dl.txt", "chunk_index": 0},
+    {"source": "cooking.txt", "chunk_index": 0},
+]
+
+
+@pytest.fixture(scope="class")
+def search_data(collection):
+    """
+    Store the search test documents once for the whole class.
+
+    TestSearch only reads the collection, so one upsert serves every test.
+    The collection is always reset first: other classes can leave the same
+    number of unrelated points behind, so a point count can't tell whether
+    these documents are already there.
+    """
+    _delete_all_points(collection)
+    store_embedding_matrix(SEARCH_CONTENTS, SEARCH_VECTORS, SEARCH_METADATAS)
+
+    # One throwaway wide search pages in the index, so the first test sees
+    # the same warm server as the rest. It goes straight to the client so
+    # it doesn't seed the search cache the tests exercise.
+    collection.query_points(
+        collection_name=retriever.COLLECTION_NAME,
+        query=UNIFORM_VECTOR,
+        limit=len(SEARCH_CONTENTS),
+        search_params=SearchParams(hnsw_ef=128),
+        with_payload=False
+    )
+
+
+@pytest.fixture(scope="class")
+def batched_results(search_data):
+    """Rank all documents for every SEARCH_QUERIES query in one request."""
+    results = search_batch(list(SEARCH_QUERIES.values()), top_k=3, search_ef=TEST_SEARCH_EF)
+    return dict(zip(SEARCH_QUERIES, results))
+
+
+@pytest.mark.usefixtures("search_data")
+class TestSearch:
+    """Tests for the search function."""
 
-    def test_search_result_structure(self):
-        """Test that search results have correct structure."""
-        query_embedding = [0.85, 0.15, 0.0] + [0.0] * (VECTOR_SIZE - 3)
-        results = search(query_embedding, top_k=1)
+    @pytest.mark.parametrize("query, top_k", [
+        ("ml", 2),
+        ("uniform", 1),
+        ("mixed", 3),
+    ])
+    def test_search_top_k_limit(self, query, top_k):
+        """Test that search returns results and respects the top_k limit."""
+        # Only the number of hits matters here, so leave the payloads on the server
+        results = search(
+            SEARCH_QUERIES[query], top_k=top_k, search_ef=TEST_SEARCH_EF, with_payload=False
+        )
+
+        assert len(results) == top_k, f"Should return {top_k} results when top_k={top_k}"
+        assert _is_desc([r["score"] for r in results]), \
+            "Results should be ordered by score descending"
 
-        assert len(results) >= 1, "Should have at least 1 result"
-        result = results[0]
+    def test_search_default_params(self):
+        """Test that search with the collection's default params ranks correctly."""
+        results = search(ML_QUERY, top_k=3)
+
+        assert len(results) == 3, "Should return 3 results"
+        assert ML_RE.search(results[0]["content"]), "ML content should be most relevant"
+        for result in results:
+            assert {"content", "metadata", "score"} <= result.keys(), \
+                "search() results should have content, metadata and score"
+
+    @pytest.mark.parametrize("query", SEARCH_QUERIES)
+    def test_search_result_structure(self, batched_results, query):
+        """Test that search_batch results have correct structure."""
+        results = batched_results[query]
+
+        assert len(results) == 3, "Should rank all 3 documents"
+        for result in results:
+            assert "content" in result, "Result should have content"
+            assert "metadata" in result, "Result should have metadata"
+            assert "score" in result, "Result should have score"
+
+    @pytest.mark.parametrize("query", SEARCH_QUERIES)
+    def test_search_scores_ordered(self, batched_results, query):
+        """Test that results are ordered by score (descending)."""
+        scores = [r["score"] for r in batched_results[query]]
 
-        assert "content" in result, "Result should have content"
-        assert "metadata" in result, "Result should have metadata"
-        assert "score" in result, "Result should have score"
+        assert _is_desc(scores), \
+            "Results should be ordered by score descending"
 
-    def test_search_relevance(self):
+    def test_search_relevance(self, batched_results):
         """Test that search returns relevant results first."""
         # Query similar to ML content
-        query_embedding = [0.85, 0.15, 0.0] + [0.0] * (VECTOR_SIZE - 3)
-        results = search(query_embedding, top_k=3)
+        results = batched_results["ml"]
 
         # ML-related content should rank higher than cooking
-        assert "machine learning" in results[0]["content"].lower() or \
-               "deep learning" in results[0]["content"].lower(), \
-               "ML content should be most relevant"
+        assert ML_RE.search(results[0]["content"]), "ML content should be most relevant"
 
         # Cooking should be least relevant
-        assert "cooking" in results[-1]["content"].lower() or \
-               "pasta" in results[-1]["content"].lower(), \
-               "Cooking content should be least relevant"
-
-    def test_search_top_k_limit(self):
-        """Test that search respects top_k limit."""
-        query_embedding = [0.5] * VECTOR_SIZE
-        results = search(query_embedding, top_k=1)
-
-        assert len(results) == 1, "Should return only 1 result when top_k=1"
-
-    def test_search_scores_ordered(self):
-        """Test that results are ordered by score (descending)."""
-        query_embedding = [0.5, 0.3, 0.2] + [0.0] * (VECTOR_SIZE - 3)
-        results = search(query_embedding, top_k=3)
-
-        scores = [r["score"] for r in results]
-        assert scores == sorted(scores, reverse=True), \
+        assert COOKING_RE.search(results[-1]["content"]), \
+            "Cooking content should be least relevant"
+
+    def test_search_batch_relevance(self, batched_results):
+        """Test that each query in a batch gets its own ranking."""
+        assert COOKING_RE.search(batched_results["cooking"][0]["content"]), \
+            "Cooking query should rank cooking content first"
+        assert ML_RE.search(batched_results["ml"][0]["content"]), \
+            "ML query should rank ML content first"
+
+
+@pytest.mark.usefixtures("search_data")
+class TestSearchInt8:
+    """
+    Tests for the int8 quantization config and the rescoring search params.
+
+    A few test points stay in a segment Qdrant never optimizes, so no int8
+    copy is built for them: these tests check the config and that the params
+    are accepted, not the accuracy of quantized search itself.
+    """
+
+    def test_collection_configures_int8(self, collection):
+        """Test that the collection is configured to keep an int8 copy of the vectors."""
+        info = collection.get_collection(retriever.COLLECTION_NAME)
+        scalar = info.config.quantization_config.scalar
+
+        assert scalar.type == ScalarType.INT8, "Collection should use int8 quantization"
+
+    def test_search_accepts_oversampling(self):
+        """Test that search with rescoring params still ranks correctly."""
+        results = search(ML_QUERY, top_k=3, oversampling=2.0)
+
+        assert ML_RE.search(results[0]["content"]), "ML content should be most relevant"
+        assert COOKING_RE.search(results[-1]["content"]), \
+            "Cooking content should be least relevant"
+        assert _is_desc([r["score"] for r in results]), \
             "Results should be ordered by score descending"
 
+    def test_search_batch_accepts_oversampling(self):
+        """Test that batched searches accept the same rescoring params."""
+        results = search_batch([ML_QUERY, COOKING_QUERY], top_k=1, oversampling=2.0)
+
+        assert ML_RE.search(results[0][0]["content"]), \
+            "ML query should rank ML content first"
+        assert COOKING_RE.search(results[1][0]["content"]), \
+            "Cooking query should rank cooking content first"
+
+
+class TestSearchCache:
+    """Tests for how search() and storing use the result cache (see test_search_cache.py)."""
+
+    def test_store_invalidates_cache(self, empty_collection):
+        """Test that storing new points is visible to the next search."""
+        query_embedding = X_AXIS
+
+        store_embeddings([{
+            "content": "Old content",
+            "embedding": query_embedding,
+            "metadata": {"source": "old.txt", "chunk_index": 0}
+        }])
+        assert search(query_embedding, top_k=2)[0]["content"] == "Old content"
+
+        store_embeddings([{
+            "content": "New content",
+            "embedding": query_embedding,
+            "metadata": {"source": "new.txt", "chunk_index": 0}
+        }])
+        contents = [r["content"] for r in search(query_embedding, top_k=2)]
+        assert "New content" in contents, "Search should not return stale cached results"
+
+    def test_search_batch_fills_cache(self, empty_collection):
+        """Test that a batch search warms the cache for later single searches."""
+        query_embedding = Y_AXIS
+
+        store_embeddings([{
+            "content": "Batched content",
+            "embedding": query_embedding,
+            "metadata": {"source": "batch.txt", "chunk_index": 0}
+        }])
+        batch_results = search_batch([query_embedding], top_k=1)
+
+        # Drop the points behind the cache's back; a cache hit still answers
+        empty_collection.delete_collection(retriever.COLLECTION_NAME)
+        try:
+            assert search(query_embedding, top_k=1) == batch_results[0], \
+                "Single search should be served from the batch's cached results"
+        finally:
+            initialize_collection(empty_collection)
+
+
+@pytest.mark.slow
+class TestBulkStoreBenchmark:
+    """Throughput check for bulk ingestion (run with --run-slow)."""
+
+    def test_bulk_upsert_speed(self, benchmark, empty_collection):
+        """Benchmark storing 1000 chunks from one embedding matrix."""
+        rng = np.random.default_rng(0)
+        vectors = rng.random((1000, VECTOR_SIZE), dtype=np.float32)
+        contents = [f"Bulk chunk {i}" for i in range(1000)]
+        metadatas = [{"source": "bulk.txt", "chunk_index": i} for i in range(1000)]
+
+        # Point IDs are deterministic, so every round overwrites the same points
+        count = benchmark(store_embedding_matrix, contents, vectors, metadatas)
+
+        assert count == 1000, "Should store 1000 points"
+        assert empty_collection.count(retriever.COLLECTION_NAME, exact=True).count == 1000
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,52 @@
+"""
+Tests for the progress checker (run.py)
+=======================================
+These tests verify how run.py attributes pytest results to steps.
+
+Run with: pytest tests/test_run.py -v
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# run.py lives at the repo root, which pytest does not put on sys.path
+root_path = str(Path(__file__).resolve().parent.parent)
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+from run import parse_junit_report
+
+
+class TestParseJunitReport:
+    """Tests for the parse_junit_report function."""
+
+    def test_collection_error_fails_only_its_module(self, tmp_path):
+        """Test that a module that fails to import only counts against its own step."""
+        report = tmp_path / "report.xml"
+        report.write_text(
+            '<testsuites><testsuite name="pytest">'
+            '<testcase classname="" name="tests.test_qa">'
+            '<error message="collection failure">SyntaxError</error></testcase>'
+            '<testcase classname="tests.test_chunking.TestChunkDocument" name="test_a"/>'
+            '<testcase classname="tests.test_retriever.TestSearch" name="test_b">'
+            '<skipped message="Qdrant not available"/></testcase>'
+            '</testsuite></testsuites>'
+        )
+
+        counts = parse_junit_report(str(report), [
+            "tests/test_chunking.py",
+            "tests/test_retriever.py::TestSearch",
+            "tests/test_qa.py",
+        ])
+
+        assert counts["tests/test_chunking.py"] == (1, 0, 0), "Chunking should pass"
+        assert counts["tests/test_retriever.py::TestSearch"] == (0, 0, 1), \
+            "Skipped tests should be counted as skipped"
+        assert counts["tests/test_qa.py"] == (0, 1, 0), \
+            "The collection error should fail only the Q&A step"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,67 @@
+"""
+Tests for the Search Cache (Step 6)
+===================================
+These tests verify the in-memory SearchCache used by search() and search_batch().
+
+Run with: pytest tests/test_search_cache.py -v
+
+Note: These tests don't need Qdrant or an API key.
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src directory to Python path when run directly (conftest does it under pytest)
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import retriever
+from retriever import SearchCache
+
+
+class TestSearchCache:
+    """Tests for the SearchCache class."""
+
+    def test_exact_and_similar_queries_hit(self):
+        """Test that identical and near-identical queries reuse cached results."""
+        cache = SearchCache(max_size=4, threshold=0.97)
+        results = [{"content": "a", "score": 0.9}, {"content": "b", "score": 0.8}]
+        cache.put([1.0, 0.0, 0.0], 2, results)
+
+        assert cache.get([1.0, 0.0, 0.0], 2) == results, "Identical query should hit"
+        assert cache.get([1.0, 0.05, 0.0], 1) == results[:1], \
+            "Similar query with smaller top_k should hit"
+        assert cache.get([0.0, 1.0, 0.0], 1) is None, "Unrelated query should miss"
+        assert cache.get([1.0, 0.0, 0.0], 3) is None, "Larger top_k should miss"
+
+    def test_entries_expire_and_are_copied(self, monkeypatch):
+        """Test that entries expire after the TTL and hits don't share metadata."""
+        now = [1000.0]
+        monkeypatch.setattr(retriever.time, "monotonic", lambda: now[0])
+        cache = SearchCache(max_size=4, threshold=0.97, ttl=60)
+        cache.put([1.0, 0.0, 0.0], 1, [{"content": "a", "metadata": {"source": "a.txt"}}])
+
+        cache.get([1.0, 0.0, 0.0], 1)[0]["metadata"]["source"] = "changed.txt"
+        assert cache.get([1.0, 0.0, 0.0], 1)[0]["metadata"]["source"] == "a.txt", \
+            "Changing a returned result should not change the cache"
+
+        now[0] += 61
+        assert cache.get([1.0, 0.0, 0.0], 1) is None, "Expired entry should miss"
+        assert cache.get([1.0, 0.05, 0.0], 1) is None, "Expired entry should not match similar queries"
+
+    def test_oldest_entry_evicted(self):
+        """Test that storing past max_size evicts the oldest entry only."""
+        cache = SearchCache(max_size=2, threshold=0.97)
+        queries = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        for i, query in enumerate(queries):
+            cache.put(query, 1, [{"content": str(i)}])
+
+        assert cache.get(queries[0], 1) is None, "Oldest entry should be evicted"
+        assert cache.get(queries[1], 1) == [{"content": "1"}], "Second entry should remain"
+        assert cache.get(queries[2], 1) == [{"content": "2"}], "Newest entry should remain"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])